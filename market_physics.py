@@ -37,35 +37,27 @@ def load_daily_data(force_refresh=False, state="QLD"):
         if 'price_cpl' not in use_cols or ('scraped_at' not in use_cols and 'reported_at' not in use_cols):
             return pd.DataFrame(columns=['day', 'price_cpl'])
         col = 'scraped_at' if 'scraped_at' in use_cols else 'reported_at'
-        daily_values = {}
 
-        for chunk in pd.read_csv(HISTORY_FILE, usecols=use_cols, chunksize=50000):
-            if 'state' in chunk.columns:
-                chunk = chunk[chunk['state'].astype(str).str.upper() == state.upper()].copy()
-            elif state != "QLD":
-                return pd.DataFrame(columns=['day', 'price_cpl'])
-
-            if chunk.empty:
-                continue
-
-            chunk['price_cpl'] = pd.to_numeric(chunk['price_cpl'], errors='coerce')
-            chunk['date'] = pd.to_datetime(chunk[col], errors='coerce')
-            chunk = chunk.dropna(subset=['date', 'price_cpl'])
-            chunk = chunk[(chunk['price_cpl'] > 80) & (chunk['price_cpl'] < 350)]
-            if chunk.empty:
-                continue
-
-            chunk['day'] = chunk['date'].dt.normalize()
-            for day, prices in chunk.groupby('day')['price_cpl']:
-                daily_values.setdefault(day, []).extend(prices.astype(float).tolist())
+        # One multi-threaded pass over just the needed columns; the median is
+        # taken per day in pandas rather than via Python lists of every price.
+        df = pd.read_csv(HISTORY_FILE, usecols=use_cols, engine='pyarrow')
+        if 'state' in df.columns:
+            df = df[df['state'].astype(str).str.upper() == state.upper()]
+        elif state != "QLD":
+            return pd.DataFrame(columns=['day', 'price_cpl'])
 
-        if not daily_values:
+        price = pd.to_numeric(df['price_cpl'], errors='coerce').astype(float)
+        date = pd.to_datetime(df[col], errors='coerce')
+        valid = date.notna() & price.between(80, 350, inclusive='neither')
+        if not valid.any():
             return pd.DataFrame(columns=['day', 'price_cpl'])
 
-        daily_df = pd.DataFrame(
-            {'day': day, 'price_cpl': float(pd.Series(values).median())}
-            for day, values in daily_values.items()
-        ).sort_values('day')
+        daily_df = (
+            price[valid]
+            .groupby(date[valid].dt.normalize().rename('day'), sort=True)
+            .median()
+            .reset_index()
+        )
         
         # Save Cache
         daily_df['day_str'] = daily_df['day'].dt.strftime('%Y-%m-%d')
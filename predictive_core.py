@@ -1,17 +1,154 @@
 import os
+import hashlib
 import joblib
 import logging
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
 import xgboost as xgb
+from sklearn.model_selection import cross_val_predict
 
 from cycle_detector import CycleDetector
 
 warnings.filterwarnings('ignore')
 logger = logging.getLogger(__name__)
 
+# Optional Numba JIT for the single-pass rolling kernel below
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+# Optional Treelite backend: compiles the boosters to native code, which is
+# much faster than XGBoost's own predictor for the 1-row recursive forecast.
+try:
+    import treelite
+    import tl2cgen
+    _HAS_TREELITE = True
+except ImportError:
+    _HAS_TREELITE = False
+
+# Feature windows shared by training and the recursive forecast
+_LAGS = (1, 2, 3, 7, 14, 21, 28, 35, 42)
+_TGP_PROXY_WINDOW = 14
+_VOLATILITY_WINDOW = 7
+
+
+def _booster_fingerprint(model):
+    """SHA-256 of the booster's raw bytes; ties a compiled library to its model."""
+    return hashlib.sha256(model.get_booster().save_raw()).hexdigest()
+
+
+def _rolling_min_std(prices, min_window, std_window):
+    """
+    Trailing rolling min and sample std in one O(N) pass.
+
+    The min uses a monotonic deque of indices (stale ones popped from the
+    front, dominated ones from the back); the std uses Welford add/remove
+    updates. Matches ``rolling(w, min_periods=1).min()/.std()``.
+    """
+    n = prices.shape[0]
+    mins = np.empty(n)
+    stds = np.empty(n)
+    deque = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    count = 0
+    mean = 0.0
+    ssqdm = 0.0
+    same_run = 0
+
+    for i in range(n):
+        x = prices[i]
+        same_run = same_run + 1 if i > 0 and x == prices[i - 1] else 1
+
+        while tail > head and prices[deque[tail - 1]] >= x:
+            tail -= 1
+        deque[tail] = i
+        tail += 1
+        if deque[head] <= i - min_window:
+            head += 1
+        mins[i] = prices[deque[head]]
+
+        count += 1
+        delta = x - mean
+        mean += delta / count
+        ssqdm += delta * (x - mean)
+        if i >= std_window:
+            old = prices[i - std_window]
+            count -= 1
+            delta = old - mean
+            mean -= delta / count
+            ssqdm -= delta * (old - mean)
+        if count < 2:
+            stds[i] = np.nan
+        elif same_run >= count:
+            # Flat window: report an exact zero rather than add/remove round-off
+            stds[i] = 0.0
+        else:
+            stds[i] = np.sqrt(max(ssqdm, 0.0) / (count - 1))
+
+    return mins, stds
+
+
+if _HAS_NUMBA:
+    _rolling_min_std = njit(cache=True)(_rolling_min_std)
+
+
+class _RollingFeatureState:
+    """
+    Trailing price window for the recursive forecast.
+
+    Keeps the last ``max(_LAGS) + 1`` daily prices in a ring buffer so each
+    forecast day builds its feature row in O(1), instead of re-running
+    ``_feature_engineering`` over the whole history.
+    """
+
+    def __init__(self, history_prices):
+        self.size = max(_LAGS) + 1
+        self.buf = np.full(self.size, np.nan)
+        self.pos = -1
+        self.count = 0
+        for price in np.asarray(history_prices, dtype=float)[-self.size:]:
+            self._push(price)
+
+    def _push(self, price):
+        self.pos = (self.pos + 1) % self.size
+        self.buf[self.pos] = price
+        self.count += 1
+
+    def _recent(self, n):
+        """Last ``n`` prices (fewer if not yet available), oldest first."""
+        n = min(n, self.count, self.size)
+        return self.buf[(self.pos - np.arange(n - 1, -1, -1)) % self.size]
+
+    def _lag(self, k):
+        return self.buf[(self.pos - k) % self.size] if k < min(self.count, self.size) else np.nan
+
+    def step(self, price, date):
+        """Append ``price`` observed on ``date`` and return its feature values."""
+        # Proxy is the min of the 14 days *before* today (rolling min shifted by 1)
+        previous = self._recent(_TGP_PROXY_WINDOW)
+        tgp_proxy = previous.min() if previous.size else np.nan
+        self._push(price)
+
+        feats = {f'lag_{lag}': self._lag(lag) for lag in _LAGS}
+        window = self._recent(_VOLATILITY_WINDOW)
+
+        feats['price_cpl'] = price
+        feats['tgp_proxy_14d'] = tgp_proxy
+        feats['velo_1d'] = price - feats['lag_1']
+        feats['velo_7d'] = price - feats['lag_7']
+        feats['accel_1d'] = feats['velo_1d'] - (feats['lag_1'] - feats['lag_2'])
+        feats['volatility_7d'] = window.std(ddof=1) if window.size > 1 else np.nan
+        feats['gross_margin'] = price - tgp_proxy
+        feats['day_of_week'] = date.dayofweek
+        return feats
+
+
 class DeepCycleModel:
     """
     Hybrid Prediction Engine for Australian Fuel Price Cycles.
@@ -27,6 +164,12 @@ class DeepCycleModel:
     - Hike probabilities and cycle regime tags
     """
     MIN_ML_HISTORY_DAYS = 45
+    PRED_CACHE_MAX = 4096
+    STACK_FOLDS = 5
+    NON_FEATURE_COLS = frozenset({
+        'date', 'price_next', 'target_delta', 'is_hike', 'reported_at',
+        'site_id', 'region', 'latitude', 'longitude', 'state', 'scraped_at'
+    })
     CITY_TO_STATE = {
         "brisbane": "QLD",
         "sydney": "NSW",
@@ -68,6 +211,16 @@ class DeepCycleModel:
         self.tgp_proxy_col = 'tgp_proxy_14d'
         self.loaded = False
         self.detector = CycleDetector()
+        
+        # Compiled Treelite predictors (None -> use the XGBoost models directly)
+        self._clf_pred = None
+        self._reg_pred = None
+        # Booster hashes of the saved models; a compiled library is only used
+        # if its sidecar carries the same hash
+        self._fingerprints = {}
+        
+        # Memoized single-row predictions, keyed by the float32 feature bytes
+        self._pred_cache = {}
 
     @staticmethod
     def _select_date_column(df):
@@ -102,29 +255,36 @@ class DeepCycleModel:
         if df.empty:
             return pd.DataFrame(columns=["date", "price_cpl"])
 
-        df_daily = df.groupby(df["date"].dt.floor("D"))["price_cpl"].median().reset_index()
+        # normalize() keeps the key as datetime64 and groupby(sort=True) already
+        # returns the days in order, so no extra parse or sort pass is needed.
+        df_daily = df.groupby(df["date"].dt.normalize(), sort=True)["price_cpl"].median().reset_index()
         df_daily.columns = ["date", "price_cpl"]
-        return df_daily.sort_values("date").reset_index(drop=True)
+        return df_daily
 
     def _feature_engineering(self, df):
         """Build lag and rolling indicators for the regression models."""
         df = df.copy()
         df = df.sort_values('date').reset_index(drop=True)
         
-        # 1. Baseline Proxy (Wholesale estimation)
-        df[self.tgp_proxy_col] = df['price_cpl'].rolling(window=14, min_periods=1).min().shift(1)
-        df[self.tgp_proxy_col] = df[self.tgp_proxy_col].fillna(method='bfill')
+        # 1. Baseline Proxy (Wholesale estimation) + 7d volatility
+        if _HAS_NUMBA:
+            prices = df['price_cpl'].to_numpy(dtype=np.float64)
+            min_14d, std_7d = _rolling_min_std(prices, _TGP_PROXY_WINDOW, _VOLATILITY_WINDOW)
+            df[self.tgp_proxy_col] = pd.Series(min_14d, index=df.index).shift(1)
+        else:
+            df[self.tgp_proxy_col] = df['price_cpl'].rolling(window=_TGP_PROXY_WINDOW, min_periods=1).min().shift(1)
+            std_7d = df['price_cpl'].rolling(_VOLATILITY_WINDOW, min_periods=1).std()
+        df[self.tgp_proxy_col] = df[self.tgp_proxy_col].bfill()
         
         # 2. Lags
-        lags = [1, 2, 3, 7, 14, 21, 28, 35, 42]
-        for lag in lags:
+        for lag in _LAGS:
             df[f'lag_{lag}'] = df['price_cpl'].shift(lag)
             
         # 3. Technical/Velocity Indicators
         df['velo_1d'] = df['price_cpl'] - df['lag_1']
         df['velo_7d'] = df['price_cpl'] - df['lag_7']
         df['accel_1d'] = df['velo_1d'] - (df['lag_1'] - df['lag_2'])
-        df['volatility_7d'] = df['price_cpl'].rolling(7, min_periods=1).std()
+        df['volatility_7d'] = std_7d
         df['gross_margin'] = df['price_cpl'] - df[self.tgp_proxy_col]
         
         # 4. Cycle Detector Features (Days since peak/trough + day of week)
@@ -155,6 +315,18 @@ class DeepCycleModel:
         df = df.ffill().bfill()
         return df
 
+    @staticmethod
+    def _days_since_turns(prices):
+        """Days since the last detected peak and trough (30 if none yet)."""
+        pt = CycleDetector.find_peaks_and_troughs(prices)
+        last = len(prices) - 1
+        peaks = pt['peak_indices']
+        troughs = pt['trough_indices']
+        return (
+            last - peaks[-1] if len(peaks) > 0 else 30,
+            last - troughs[-1] if len(troughs) > 0 else 30,
+        )
+
     def train(self, csv_path, city_name='brisbane'):
         """Train classifier and regressor from clean historical daily prices."""
         logger.info("🚀 Training hybrid model for %s...", city_name)
@@ -170,13 +342,9 @@ class DeepCycleModel:
         # Feature Engineering
         df_feats = self._feature_engineering(df_daily)
         
-        # Exclude non-feature columns
-        self.feature_cols = [
-            c for c in df_feats.columns if c not in [
-                'date', 'price_next', 'target_delta', 'is_hike', 'reported_at', 
-                'site_id', 'region', 'latitude', 'longitude', 'state', 'scraped_at'
-            ]
-        ]
+        # Exclude non-feature columns. The list is fixed here (and persisted by
+        # save) so inference never re-derives it from a DataFrame's columns.
+        self.feature_cols = [c for c in df_feats.columns if c not in self.NON_FEATURE_COLS]
         
         # Set targets
         df_feats['price_next'] = df_feats['price_cpl'].shift(-1)
@@ -190,13 +358,25 @@ class DeepCycleModel:
         y_class = df_feats['is_hike']
         y_reg = df_feats['target_delta']
         
-        # Train
-        self.classifier.fit(X, y_class)
-        
-        # Stack predicted hike probability into regressor features
+        # Stack out-of-fold hike probability into regressor features. This
+        # removes the dependency on the final classifier, so both fits can
+        # run side by side (XGBoost releases the GIL while boosting).
         X_reg = X.copy()
-        X_reg['hike_prob'] = self.classifier.predict_proba(X)[:, 1]
-        self.regressor.fit(X_reg, y_reg)
+        n_folds = min(self.STACK_FOLDS, int(y_class.value_counts().min()))
+        if y_class.nunique() > 1 and n_folds >= 2:
+            X_reg['hike_prob'] = cross_val_predict(
+                self.classifier, X, y_class, cv=n_folds, method='predict_proba', n_jobs=-1
+            )[:, 1]
+            with ThreadPoolExecutor(max_workers=2) as ex:
+                clf_fit = ex.submit(self.classifier.fit, X, y_class)
+                reg_fit = ex.submit(self.regressor.fit, X_reg, y_reg)
+                clf_fit.result()
+                reg_fit.result()
+        else:
+            # Too few hikes to fold; fall back to in-sample stacking
+            self.classifier.fit(X, y_class)
+            X_reg['hike_prob'] = self.classifier.predict_proba(X)[:, 1]
+            self.regressor.fit(X_reg, y_reg)
         
         self.loaded = True
         self.save(city_name)
@@ -204,11 +384,116 @@ class DeepCycleModel:
 
     def save(self, name):
         """Serialize models and feature structure."""
+        self._fingerprints = {
+            'clf': _booster_fingerprint(self.classifier),
+            'reg': _booster_fingerprint(self.regressor),
+        }
+        # Libraries on disk belong to the previous model; drop them before the
+        # new package lands so no later load() can pair the two.
+        self._remove_compiled(name)
         joblib.dump({
             'classifier': self.classifier,
             'regressor': self.regressor,
-            'features': self.feature_cols
+            'features': self.feature_cols,
+            'fingerprints': self._fingerprints,
         }, os.path.join(self.model_dir, f"{name}.pkl"))
+        self._compile_predictors(name)
+
+    def _compiled_path(self, name, kind):
+        return os.path.join(self.model_dir, f"{name}_{kind}.so")
+
+    def _fingerprint_path(self, name, kind):
+        return self._compiled_path(name, kind) + '.sha256'
+
+    def _remove_compiled(self, name, kinds=('clf', 'reg')):
+        for kind in kinds:
+            for path in (self._compiled_path(name, kind), self._fingerprint_path(name, kind)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _compile_predictors(self, name):
+        """Compile classifier and regressor to shared libraries via Treelite."""
+        self._clf_pred = None
+        self._reg_pred = None
+        self._pred_cache.clear()
+        if not _HAS_TREELITE:
+            return
+
+        for kind, model in (('clf', self.classifier), ('reg', self.regressor)):
+            libpath = self._compiled_path(name, kind)
+            try:
+                tl_model = treelite.frontend.from_xgboost(model.get_booster())
+                tl2cgen.export_lib(tl_model, toolchain='gcc', libpath=libpath, params={'parallel_comp': 0})
+            except Exception as e:
+                logger.warning("Treelite compilation of %s model failed: %s", kind, e)
+                # Never leave a stale library behind for a freshly trained model
+                self._remove_compiled(name, (kind,))
+                return
+            with open(self._fingerprint_path(name, kind), 'w') as f:
+                f.write(self._fingerprints[kind])
+
+        self._load_predictors(name)
+
+    def _load_predictors(self, name):
+        """Load compiled predictors if present; otherwise keep the XGBoost path."""
+        self._clf_pred = None
+        self._reg_pred = None
+        self._pred_cache.clear()
+        if not _HAS_TREELITE:
+            return
+
+        clf_path = self._compiled_path(name, 'clf')
+        reg_path = self._compiled_path(name, 'reg')
+        if not (os.path.exists(clf_path) and os.path.exists(reg_path)):
+            return
+        for kind in ('clf', 'reg'):
+            try:
+                with open(self._fingerprint_path(name, kind)) as f:
+                    compiled_from = f.read().strip()
+            except OSError:
+                compiled_from = None
+            if not compiled_from or compiled_from != self._fingerprints.get(kind):
+                logger.warning("Ignoring compiled %s predictor for %s: built from a different model", kind, name)
+                return
+        try:
+            self._clf_pred = tl2cgen.Predictor(clf_path)
+            self._reg_pred = tl2cgen.Predictor(reg_path)
+        except Exception as e:
+            logger.warning("Could not load compiled predictors for %s: %s", name, e)
+            self._clf_pred = None
+            self._reg_pred = None
+
+    def _cached_prediction(self, kind, X, predict):
+        """
+        Reuse an earlier prediction for an identical row. Both boosters see
+        features as float32, so equal float32 bytes give an equal prediction.
+        Dashboard refreshes over the same history hit this on every day.
+        """
+        X32 = np.asarray(X, dtype=np.float32)
+        key = (kind, X32.tobytes())
+        value = self._pred_cache.get(key)
+        if value is None:
+            value = predict(X32)
+            if len(self._pred_cache) >= self.PRED_CACHE_MAX:
+                self._pred_cache.clear()
+            self._pred_cache[key] = value
+        return value
+
+    def _predict_hike_proba(self, X):
+        """Hike probability for a single feature row."""
+        def predict(X32):
+            if self._clf_pred is not None:
+                return float(np.ravel(self._clf_pred.predict(tl2cgen.DMatrix(X32)))[0])
+            return float(self.classifier.predict_proba(X32)[0, 1])
+        return self._cached_prediction('clf', X, predict)
+
+    def _predict_delta(self, X_reg):
+        """Next-day price delta for a single (stacked) feature row."""
+        def predict(X32):
+            if self._reg_pred is not None:
+                return float(np.ravel(self._reg_pred.predict(tl2cgen.DMatrix(X32)))[0])
+            return float(self.regressor.predict(X32)[0])
+        return self._cached_prediction('reg', X_reg, predict)
 
     def load(self, name):
         """De-serialize model package."""
@@ -219,6 +504,8 @@ class DeepCycleModel:
                 self.classifier = data['classifier']
                 self.regressor = data['regressor']
                 self.feature_cols = data['features']
+                self._fingerprints = data.get('fingerprints', {})
+                self._load_predictors(name)
                 self.loaded = True
                 return True
             except Exception as e:
@@ -326,39 +613,47 @@ class DeepCycleModel:
             
         # 2. Run recursive ML model
         ml_preds = []
-        ml_history = history_df.copy()
-        current_date = ml_history['date'].iloc[-1]
+        current_date = history_df['date'].iloc[-1]
         
         try:
             self.detector.fit(history_df['price_cpl'])
             
+            # Scan the history once; each forecast day then only advances the window
+            # Preallocated price history: forecast days are written in place
+            n = len(history_df)
+            prices = np.empty(n + days, dtype=np.float64)
+            prices[:n] = history_df['price_cpl'].to_numpy(dtype=np.float64)
+            state = _RollingFeatureState(prices[:n - 1])
+            last_price = float(prices[n - 1])
+            needs_turns = bool({'days_since_peak', 'days_since_trough'} & set(self.feature_cols))
+            
             for step in range(1, days + 1):
-                # Prepare features
-                feats_df = self._feature_engineering(ml_history)
-                last_row = feats_df.iloc[[-1]].copy()
+                # Prepare features for the latest known day
+                feats = state.step(last_price, current_date)
+                if needs_turns:
+                    feats['days_since_peak'], feats['days_since_trough'] = self._days_since_turns(prices[:n])
                 
                 # Dynamic cycle probabilities from detector
-                cycle_info = self.detector.detect_current_regime(ml_history['price_cpl'])
+                cycle_info = self.detector.detect_current_regime(prices[:n])
                 hike_prob = float(cycle_info['probabilities'][CycleDetector.RESTORATION])
                 
                 # Set dynamic features
-                last_row['regime_probability'] = hike_prob
+                feats['regime_probability'] = hike_prob
                 
                 # Predict
-                X = last_row[self.feature_cols]
-                hike_prob_xgb = self.classifier.predict_proba(X)[0, 1]
+                X = np.array([[feats[c] for c in self.feature_cols]], dtype=np.float64)
+                hike_prob_xgb = self._predict_hike_proba(X)
                 
                 # Blended hike probability (XGBoost + Cycle State Engine)
                 hike_prob_final = 0.6 * hike_prob_xgb + 0.4 * hike_prob
                 
                 # Regress delta
-                X_reg = X.copy()
-                X_reg['hike_prob'] = hike_prob_final
-                pred_delta = self.regressor.predict(X_reg)[0]
+                X_reg = np.append(X, [[hike_prob_final]], axis=1)
+                pred_delta = self._predict_delta(X_reg)
                 
                 # Update price state
-                current_price = last_row['price_cpl'].values[0]
-                new_price = current_price + pred_delta
+                new_price = last_price + pred_delta
+                last_price = new_price
                 current_date += timedelta(days=1)
                 
                 ml_preds.append({
@@ -370,8 +665,8 @@ class DeepCycleModel:
                 })
                 
                 # Append to rolling history
-                new_row = pd.DataFrame({'date': [current_date], 'price_cpl': [new_price]})
-                ml_history = pd.concat([ml_history, new_row], ignore_index=True)
+                prices[n] = new_price
+                n += 1
                 
             ml_df = pd.DataFrame(ml_preds)
             
@@ -1,23 +1,87 @@
 import sys
 import os
+import time
+import tempfile
 import pandas as pd
 import numpy as np
 import requests
 import polyline
+import threading
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from scipy.spatial import cKDTree
 from math import radians, cos, sin, asin, sqrt
 import config
 
+# Optional multi-threaded CSV reader for the station snapshot
+try:
+    import pyarrow.csv as pv
+except ImportError:
+    pv = None
+
+# Optional fast JSON decoder for the OSRM geometry payload
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional persistent cache so repeat lookups survive restarts (Nominatim is 1 req/s)
+try:
+    import diskcache
+    _DISK_CACHE = diskcache.Cache(os.path.join(tempfile.gettempdir(), "fuel_cache"))
+except Exception:
+    _DISK_CACHE = None
+
 # Note: Removed FuelEngine import as requested to avoid external API calls for pricing.
 
+# Back-to-back route requests share one parsed snapshot. After the TTL the file
+# is re-stat'ed and only re-parsed if the sync job has rewritten it.
+_SNAPSHOT_TTL = 60
+_snapshot_lock = threading.Lock()
+_snapshot_cache = {'expires': 0.0, 'key': None, 'df': None}
+
+def _snapshot_key(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
 def load_local_data():
-    """Load from local snapshot."""
+    """Load from local snapshot (cached for _SNAPSHOT_TTL seconds; treat as read-only)."""
     snapshot_file = "live_snapshot.csv"
+    with _snapshot_lock:
+        now = time.time()
+        if _snapshot_cache['df'] is not None and _snapshot_cache['expires'] > now:
+            return _snapshot_cache['df']
+        key = _snapshot_key(snapshot_file)
+        if key is not None and key == _snapshot_cache['key']:
+            _snapshot_cache['expires'] = now + _SNAPSHOT_TTL
+            return _snapshot_cache['df']
+        df = _read_snapshot(snapshot_file)
+        if key is not None and not df.empty:
+            _snapshot_cache.update(expires=now + _SNAPSHOT_TTL, key=key, df=df)
+        return df
+
+def _read_snapshot(snapshot_file):
     if os.path.exists(snapshot_file):
         try:
-            df = pd.read_csv(snapshot_file)
-            # Ensure required columns exist
             req_cols = ['latitude', 'longitude', 'price_cpl']
+            if pv is not None:
+                # Parallel C++ parse. Values go back out in the API response, so keep
+                # float64 coordinates/prices and leave timestamps as strings.
+                column_types = {c: 'float64' for c in req_cols}
+                column_types.update({'reported_at': 'string', 'scraped_at': 'string'})
+                table = pv.read_csv(
+                    snapshot_file,
+                    read_options=pv.ReadOptions(use_threads=True),
+                    convert_options=pv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+                )
+                df = table.to_pandas()
+            else:
+                df = pd.read_csv(snapshot_file)
+            # Ensure required columns exist
             if not all(col in df.columns for col in req_cols):
                 return pd.DataFrame()
                 
@@ -27,105 +91,201 @@ def load_local_data():
             print(f"Warning: Error loading local data: {e}")
     return pd.DataFrame()
 
-_GEOCODE_CACHE_MAX = 256
-_geocode_cache = OrderedDict()
+# Shared keep-alive session so repeat Nominatim/OSRM calls skip the TCP+TLS handshake
+_SESSION = requests.Session()
+_SESSION.headers.update({'User-Agent': config.USER_AGENT})
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
 
-def get_coords_from_address(address):
-    global _geocode_cache
-    if address in _geocode_cache:
-        _geocode_cache.move_to_end(address)
-        return _geocode_cache[address]
+_CACHE_MAX = 1024
+_GEOCODE_TTL = 24 * 3600  # Coordinates are stable
+_ROUTE_TTL = 3600
+_lookup_cache = OrderedDict()
+_lookup_lock = threading.Lock()
+
+def _cache_get(key):
+    """In-memory LRU first, then the on-disk cache. Returns None on miss/expiry."""
+    now = time.time()
+    with _lookup_lock:
+        hit = _lookup_cache.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                _lookup_cache.move_to_end(key)
+                return hit[1]
+            del _lookup_cache[key]
+
+    if _DISK_CACHE is None:
+        return None
+    try:
+        value, expires = _DISK_CACHE.get(key, expire_time=True)
+    except Exception:
+        return None
+    if value is not None:
+        _cache_put(key, value, (expires or now + _ROUTE_TTL) - now, persist=False)
+    return value
+
+def _cache_put(key, value, ttl, persist=True):
+    with _lookup_lock:
+        _lookup_cache[key] = (time.time() + ttl, value)
+        _lookup_cache.move_to_end(key)
+        while len(_lookup_cache) > _CACHE_MAX:
+            _lookup_cache.popitem(last=False)
+    if persist and _DISK_CACHE is not None:
+        try:
+            _DISK_CACHE.set(key, value, expire=ttl)
+        except Exception:
+            pass
+
+def get_coords_from_address(address, session=_SESSION):
+    key = ('geo', " ".join(str(address).lower().split()))
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
 
     params = {'q': f"{address}, Australia", 'format': 'json', 'limit': 1}
-    headers = {'User-Agent': config.USER_AGENT}
     try:
-        r = requests.get(config.NOMINATIM_BASE_URL, params=params, headers=headers, timeout=5)
+        r = session.get(config.NOMINATIM_BASE_URL, params=params, timeout=5)
         if r.status_code == 200 and r.json():
             data = r.json()[0]
             res = (float(data['lat']), float(data['lon']), data['display_name'])
-            _geocode_cache[address] = res
-            _geocode_cache.move_to_end(address)
-            while len(_geocode_cache) > _GEOCODE_CACHE_MAX:
-                _geocode_cache.popitem(last=False)
+            _cache_put(key, res, _GEOCODE_TTL)
             return res
     except Exception:
         pass
     return None, None, None
 
-def get_osrm_route(lat1, lon1, lat2, lon2):
-    url = f"{config.OSRM_BASE_URL}/{lon1},{lat1};{lon2},{lat2}?overview=full&geometries=geojson"
+def get_osrm_route(lat1, lon1, lat2, lon2, session=_SESSION):
+    # Round so geocoder jitter on the same address pair still hits the cache
+    key = ('route', round(lat1, 4), round(lon1, 4), round(lat2, 4), round(lon2, 4))
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    url = f"{config.OSRM_BASE_URL}/{lon1},{lat1};{lon2},{lat2}?overview=simplified&geometries=geojson"
     try:
-        r = requests.get(url, timeout=10)
+        r = session.get(url, timeout=10)
         if r.status_code == 200:
-            data = r.json()
+            data = orjson.loads(r.content) if orjson is not None else r.json()
             if data['code'] == 'Ok' and len(data['routes']) > 0:
-                return [[p[1], p[0]] for p in data['routes'][0]['geometry']['coordinates']], data['routes'][0]['distance'] / 1000.0
+                res = ([[p[1], p[0]] for p in data['routes'][0]['geometry']['coordinates']], data['routes'][0]['distance'] / 1000.0)
+                _cache_put(key, res, _ROUTE_TTL)
+                return res
     except Exception:
         pass
     return None, None
 
-def calculate_detour_utility(station, route_dist_km, market_avg_price, tank_capacity=50, current_fuel=10, km_per_liter=10, hourly_wage=30.0):
-    price = station['price_cpl']
+# Coarse lat/lon grid over the snapshot. A cell is as wide as the 0.05 deg
+# proximity cut in optimize_route, so a route vertex's 3x3 cell neighbourhood
+# holds every station that can pass that cut.
+_GRID_CELL_DEG = 0.05
+_GRID_STRIDE = 8192  # > 2 * (180 / _GRID_CELL_DEG), keeps (lat, lon) cell keys unique
+_grid_lock = threading.Lock()
+_grid_index = {'df': None, 'order': None, 'cells': None}
+
+def _cell_keys(lats, lons):
+    ix = np.floor(np.asarray(lats, dtype=np.float64) / _GRID_CELL_DEG).astype(np.int64)
+    iy = np.floor(np.asarray(lons, dtype=np.float64) / _GRID_CELL_DEG).astype(np.int64)
+    return ix * _GRID_STRIDE + iy
+
+def _station_grid(df):
+    """Row order and sorted cell keys for the snapshot, rebuilt only when it changes."""
+    with _grid_lock:
+        if _grid_index['df'] is not df:
+            cells = _cell_keys(df['latitude'].to_numpy(), df['longitude'].to_numpy())
+            order = np.argsort(cells, kind='stable')
+            _grid_index.update(df=df, order=order, cells=cells[order])
+        return _grid_index['order'], _grid_index['cells']
+
+# OSRM's simplified geometry keeps few vertices on straight roads, so the
+# polyline is re-sampled to at most this spacing before the grid and KD-tree
+# lookups; nearest-vertex distance then overstates segment distance by at
+# most half a step (~1 km), well inside the 0.05 deg cut.
+_ROUTE_STEP_DEG = 0.02
+
+def _densify_route(route_arr, step=_ROUTE_STEP_DEG):
+    """Insert evenly spaced points so no route segment is longer than ``step`` degrees."""
+    if len(route_arr) < 2:
+        return route_arr
+    seg = np.diff(route_arr, axis=0)
+    n = np.maximum(np.ceil(np.hypot(seg[:, 0], seg[:, 1]) / step), 1).astype(np.int64)
+    seg_idx = np.repeat(np.arange(len(seg)), n)
+    frac = (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)) / n[seg_idx]
+    points = route_arr[:-1][seg_idx] + frac[:, None] * seg[seg_idx]
+    return np.vstack([points, route_arr[-1:]])
+
+def _stations_near_route(df, route_arr):
+    """Positional indices of stations in cells touched by the route (1-cell dilation)."""
+    order, cells = _station_grid(df)
+    route_cells = np.unique(_cell_keys(route_arr[:, 0], route_arr[:, 1]))
+    offsets = np.array([dx * _GRID_STRIDE + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+    wanted = np.unique((route_cells[:, None] + offsets[None, :]).ravel())
+    lo = np.searchsorted(cells, wanted, side='left')
+    hi = np.searchsorted(cells, wanted, side='right')
+    hits = [order[a:b] for a, b in zip(lo, hi) if b > a]
+    if not hits:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(hits))
+
+def calculate_detour_utility(stations, route_dist_km, market_avg_price, tank_capacity=50, current_fuel=10, km_per_liter=10, hourly_wage=30.0):
+    """Net dollar benefit of detouring to each station, as one vectorized pass."""
+    price = stations['price_cpl'].to_numpy(dtype=np.float64)
     # Approximate detour distance (x2 for return trip from route line)
-    detour_km = (station['dist_score'] * 111.0) * 2.0 
-    
-    # Filter out stations too far from route (e.g. > 5km detour)
-    if detour_km > 5.0: return -999.0
+    detour_km = stations['dist_score'].to_numpy(dtype=np.float64) * (111.0 * 2.0)
     
     fill_vol = tank_capacity - current_fuel
-    if fill_vol <= 0: return -999.0
+    if fill_vol <= 0: return np.full(len(price), -999.0)
     
     gross_save = (market_avg_price - price) / 100.0 * fill_vol
     time_cost = ((detour_km / 40.0) + 0.08) * hourly_wage # Assumes 40km/h detour speed + 5 min stop
     fuel_cost = (detour_km / km_per_liter) * (price / 100.0)
     
-    return gross_save - (time_cost + fuel_cost)
+    # Filter out stations too far from route (e.g. > 5km detour)
+    return np.where(detour_km > 5.0, -999.0, gross_save - (time_cost + fuel_cost))
 
 def optimize_route(start_address, end_address, tank_capacity=50, current_fuel=10, km_per_liter=10, hourly_wage=30.0):
-    lat1, lon1, name1 = get_coords_from_address(start_address)
-    lat2, lon2, name2 = get_coords_from_address(end_address)
-    if lat1 is None or lat2 is None: return None
+    # Geocode one end at a time: Nominatim's usage policy allows no parallel requests
+    lat1, lon1, name1 = get_coords_from_address(start_address, _SESSION)
+    if lat1 is None: return None
+    lat2, lon2, name2 = get_coords_from_address(end_address, _SESSION)
+    if lat2 is None: return None
+
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        # Fetch the route in the background while the local pricing data loads
+        route_future = ex.submit(get_osrm_route, lat1, lon1, lat2, lon2, _SESSION)
+
+        # Load Pricing Data (Local Only)
+        df = load_local_data()
+
+        route_path, route_dist = route_future.result()
 
-    route_path, route_dist = get_osrm_route(lat1, lon1, lat2, lon2)
     if not route_path: 
         # Fallback to straight line if OSRM fails
         route_path, route_dist = [[lat1, lon1], [lat2, lon2]], 0
-
-    # Load Pricing Data (Local Only)
-    df = load_local_data()
         
     if df.empty: return None
     
     market_avg = df['price_cpl'].median()
     
-    # Filter candidates - Bounding Box Optimization
-    path_lats, path_lons = zip(*route_path)
-    min_lat, max_lat = min(path_lats)-0.05, max(path_lats)+0.05
-    min_lon, max_lon = min(path_lons)-0.05, max(path_lons)+0.05
-    
-    candidates = df[
-        (df['latitude'].between(min_lat, max_lat)) & 
-        (df['longitude'].between(min_lon, max_lon))
-    ].copy()
+    # Filter candidates - only stations in grid cells along the route.
+    # The simplified OSRM geometry is densified first so stations beside a
+    # long straight segment are not measured against its far-off endpoints.
+    route_arr = _densify_route(np.asarray(route_path, dtype=np.float64))
+    candidates = df.iloc[_stations_near_route(df, route_arr)].copy()
 
     if not candidates.empty:
-        # Vectorized distance check against route points
-        # Sample route points to reduce computation if route is very detailed
-        route_arr = np.array(route_path[::5] if len(route_path) > 500 else route_path)
-        
-        def get_dist(row):
-            # Euclidean distance approximation for speed (sufficient for small area ranking)
-            # 1 deg lat approx 111km. 
-            dists = np.sqrt(np.sum((route_arr - np.array([row['latitude'], row['longitude']]))**2, axis=1))
-            return np.min(dists)
-        
-        candidates['dist_score'] = candidates.apply(get_dist, axis=1)
+        # Euclidean distance approximation for speed (sufficient for small area ranking)
+        # 1 deg lat approx 111km. Nearest route point per station via a KD-tree:
+        # O((N+M) log M) instead of materialising the full N x M distance matrix.
+        stations_xy = np.ascontiguousarray(candidates[['latitude', 'longitude']].to_numpy(dtype=np.float64))
+        tree = cKDTree(route_arr)
+        dists, _ = tree.query(stations_xy, k=1, workers=-1)
+        candidates['dist_score'] = dists
         
         # Filter strictly by proximity (approx 0.05 deg is ~5.5km)
         best = candidates[candidates['dist_score'] < 0.05].copy()
         
         if not best.empty:
-            best['net_utility'] = best.apply(lambda r: calculate_detour_utility(r, route_dist, market_avg, tank_capacity, current_fuel, km_per_liter, hourly_wage), axis=1)
+            best['net_utility'] = calculate_detour_utility(best, route_dist, market_avg, tank_capacity, current_fuel, km_per_liter, hourly_wage)
             # Remove negative utility
             best = best[best['net_utility'] > -100]
             best = best.sort_values('net_utility', ascending=False).head(15)
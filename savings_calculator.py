@@ -1,3 +1,57 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+# Cycle phase -> int code used inside the kernel; anything else is -1
+_PHASE_CODES = {"Relenting": 0, "Restoration": 1}
+
+
+def _encode_phases(phases):
+    phases = np.asarray(phases)
+    codes = np.full(phases.shape, -1, dtype=np.int8)
+    for name, code in _PHASE_CODES.items():
+        codes[phases == name] = code
+    return codes
+
+
+@lru_cache(maxsize=None)
+def _batch_opportunity_kernel():
+    """
+    Opportunity kernel for batch_report, built on first use. With Numba it is
+    JIT-compiled with a parallel prange loop; without it, it runs as plain
+    Python. Numba is imported here rather than at module scope so the
+    per-user get_report path never pays its import or compile cost.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        njit, prange = None, range
+
+    def kernel(best, bottom, phase_codes, tank):
+        """Cycle opportunity in dollars for each scenario (see calculate_opportunity)."""
+        n = best.shape[0]
+        out = np.zeros(n)
+        for i in prange(n):
+            opportunity_cpl = 0.0
+            if phase_codes[i] == 0:
+                # Relenting: saving from waiting for the bottom
+                if best[i] > bottom[i]:
+                    opportunity_cpl = best[i] - bottom[i]
+            elif phase_codes[i] == 1:
+                # Restoration: cost avoided by filling before the ~45c peak
+                peak = bottom[i] + 45.0
+                if best[i] < peak:
+                    opportunity_cpl = peak - best[i]
+            out[i] = (opportunity_cpl * tank[i]) / 100.0
+        return out
+
+    if njit is None:
+        return kernel
+    return njit(cache=True, parallel=True)(kernel)
+
+
+@dataclass(frozen=True, slots=True, init=False)
 class SavingsCalculator:
     """
     A sophisticated fuel savings calculator based on Edgeworth Price Cycle economics.
@@ -9,6 +63,13 @@ class SavingsCalculator:
     This calculator quantifies the value of timing these phases.
     """
 
+    avg_price: float
+    best_price: float
+    phase: str
+    pred_bottom: float
+    tank: int
+    annual_fills: int
+
     def __init__(self, current_avg_price, best_local_price, cycle_phase, predicted_bottom, tank_size=50, fill_frequency=52):
         """
         Initialize the calculator with market and user data.
@@ -21,15 +82,18 @@ class SavingsCalculator:
             tank_size (int): User's tank capacity in Litres.
             fill_frequency (int): Number of fills per year.
         """
-        self.avg_price = float(current_avg_price)
-        self.best_price = float(best_local_price)
-        self.phase = cycle_phase
-        self.pred_bottom = float(predicted_bottom)
-        self.tank = int(tank_size)
-        self.annual_fills = int(fill_frequency)
-        
-        # Heuristic: Edgeworth cycle spikes usually peak ~45c above the bottom
-        self.pred_peak = self.pred_bottom + 45.0
+        # Frozen: assign through object.__setattr__ (public signature unchanged)
+        object.__setattr__(self, 'avg_price', float(current_avg_price))
+        object.__setattr__(self, 'best_price', float(best_local_price))
+        object.__setattr__(self, 'phase', cycle_phase)
+        object.__setattr__(self, 'pred_bottom', float(predicted_bottom))
+        object.__setattr__(self, 'tank', int(tank_size))
+        object.__setattr__(self, 'annual_fills', int(fill_frequency))
+
+    @property
+    def pred_peak(self):
+        """Heuristic: Edgeworth cycle spikes usually peak ~45c above the bottom."""
+        return self.pred_bottom + 45.0
 
     def calculate_instant_savings(self):
         """
@@ -123,6 +187,42 @@ class SavingsCalculator:
             }
         }
 
+    @classmethod
+    def batch_report(cls, current_avg_price, best_local_price, cycle_phase, predicted_bottom, tank_size=50, fill_frequency=52):
+        """
+        Vectorized get_report figures for many scenarios at once.
+
+        Takes the same arguments as __init__, but each may be an array (or a
+        DataFrame column); scalars broadcast. Recommendation text is per-user
+        and is not produced here.
+
+        Returns: dict of NumPy arrays keyed like get_report().
+        """
+        avg = np.asarray(current_avg_price, dtype=np.float64)
+        best = np.asarray(best_local_price, dtype=np.float64)
+        phase = np.asarray(cycle_phase)
+        bottom = np.asarray(predicted_bottom, dtype=np.float64)
+        tank = np.asarray(tank_size, dtype=np.float64).astype(np.int64)
+        fills = np.asarray(fill_frequency, dtype=np.float64).astype(np.int64)
+
+        instant = np.maximum(0.0, (avg - best) * tank / 100.0)
+
+        n = np.broadcast(avg, best, phase, bottom, tank).shape
+        opportunity = _batch_opportunity_kernel()(
+            np.broadcast_to(best, n).ravel(),
+            np.broadcast_to(bottom, n).ravel(),
+            _encode_phases(np.broadcast_to(phase, n)).ravel(),
+            np.broadcast_to(tank, n).astype(np.float64).ravel(),
+        ).reshape(n)
+
+        annual = 490.0 * (tank * fills) / (50 * 52)
+
+        return {
+            "immediate_saving_dollars": np.round(instant, 2),
+            "opportunity_cost_dollars": np.round(opportunity, 2),
+            "projected_annual_saving": np.round(annual, 2),
+        }
+
 if __name__ == "__main__":
     # Test Case 1: Relenting (Prices dropping)
     calc = SavingsCalculator(
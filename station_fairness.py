@@ -6,11 +6,6 @@ except:
 import pandas as pd
 import numpy as np
 import os
-import pgeocode
-import geopandas as gpd
-from libpysal.weights import DistanceBand
-from esda.moran import Moran, Moran_Local
-from shapely.geometry import Point
 import tgp_forecast
 import config # Added import
 
@@ -19,6 +14,41 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MASTER_FILE = os.path.join(BASE_DIR, "brisbane_fuel_live_collection.csv")
 METADATA_FILE = os.path.join(BASE_DIR, "station_metadata.csv")
 OUTPUT_FILE = os.path.join(BASE_DIR, "station_ratings.csv")
+OUTPUT_FILE_PARQUET = os.path.join(BASE_DIR, "station_ratings.parquet")
+NEIGHBOUR_RADIUS_M = 5000  # Stations within this distance are spatial neighbours
+MORAN_PERMUTATIONS = 499   # p_sim resolution 0.002, ample for the 0.05 cut
+
+# Moran quadrant (1-4) -> label; 0 = not significant
+CLUSTER_LABELS = np.array([
+    "Neutral",
+    "🔴 Hot Spot (High-High)",
+    "🔵 Cold outlier (Low-High)",
+    "🟢 Cold Spot (Low-Low)",
+    "🟠 Hot outlier (High-Low)",
+])
+HOT_SPOT, COLD_SPOT = 1, 3
+
+RATING_LABELS = ["🌟 SUPER VALUE", "✅ Fair Price", "⚪ Market Price", "❌ PRICE GOUGE", "⚠️ Expensive"]
+
+_NOMI = None
+
+def _nomi():
+    """Shared pgeocode AU postcode table, parsed on first use only."""
+    global _NOMI
+    if _NOMI is None:
+        import pgeocode # Lazy import to avoid loading large dataset on startup
+        _NOMI = pgeocode.Nominatim('au')
+    return _NOMI
+
+def _to_day(values):
+    """Day-normalised timestamps: ISO 8601 fast path, mixed-format fallback."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.normalize()
+    try:
+        parsed = pd.to_datetime(values, format='ISO8601', cache=True)
+    except (ValueError, TypeError):
+        parsed = pd.to_datetime(values, format='mixed', errors='coerce')
+    return parsed.dt.normalize()
 
 def load_and_prep_data(state="QLD"):
     """
@@ -29,7 +59,8 @@ def load_and_prep_data(state="QLD"):
         return None
         
     print(f"📂 Loading station data for {state}...")
-    df = pd.read_csv(MASTER_FILE)
+    # Arrow's multi-threaded reader also types the ISO timestamps natively
+    df = pd.read_csv(MASTER_FILE, engine='pyarrow')
     
     # Filter by state
     if 'state' in df.columns:
@@ -39,22 +70,21 @@ def load_and_prep_data(state="QLD"):
         
     # Standardize columns
     if 'reported_at' in df.columns:
-        df['date'] = pd.to_datetime(df['reported_at'], format='mixed', errors='coerce').dt.normalize()
+        df['date'] = _to_day(df['reported_at'])
     elif 'scraped_at' in df.columns:
-        df['date'] = pd.to_datetime(df['scraped_at'], format='mixed', errors='coerce').dt.normalize()
+        df['date'] = _to_day(df['scraped_at'])
         
     if 'brand' not in df.columns:
         df['brand'] = None
     
-    # Drop rows with invalid dates
-    df = df.dropna(subset=['date']).copy()
-    
-    # Filter recent data (last 7 days to be relevant for current ratings)
+    # Filter recent data (last 7 days to be relevant for current ratings).
+    # NaT never compares greater, so this also drops rows with invalid dates.
     cutoff = pd.Timestamp.now() - pd.Timedelta(days=7)
-    df = df[df['date'] > cutoff].copy()
+    df = df[df['date'] > cutoff]
     
-    # Keep only the LATEST price per station
-    df = df.sort_values('date').groupby('site_id').tail(1)
+    # Keep only the LATEST price per station (no full sort needed). Dates are
+    # day-normalised, so scan from the end to take the last row on ties.
+    df = df.loc[df.iloc[::-1].groupby('site_id', sort=False)['date'].idxmax()]
     
     return df
 
@@ -102,8 +132,6 @@ def load_metadata(df):
         
     if 'suburb' not in df.columns: df['suburb'] = "Unknown"
         
-    nomi = pgeocode.Nominatim('au')
-    
     if 'name' not in df.columns:
         if 'brand' in df.columns and 'suburb' in df.columns:
              df['name'] = df['brand'].fillna('Station') + " " + df['suburb'].fillna(df['site_id'].astype(str))
@@ -115,19 +143,21 @@ def load_metadata(df):
 
     # Fill missing coords
     if 'postcode' in df.columns:
-        missing_coords = df[df['latitude'].isna() | df['longitude'].isna()]
-        for idx, row in missing_coords.iterrows():
-            try:
-                pc = str(int(float(row['postcode']))) if pd.notnull(row['postcode']) else ""
-                if pc:
-                    loc = nomi.query_postal_code(pc)
-                    if not np.isnan(loc.latitude):
-                        df.at[idx, 'latitude'] = loc.latitude
-                        df.at[idx, 'longitude'] = loc.longitude
-                        if pd.isna(row.get('suburb')): df.at[idx, 'suburb'] = loc.place_name
-            except: pass
+        missing = df['latitude'].isna() | df['longitude'].isna()
+        pcs = pd.to_numeric(df.loc[missing, 'postcode'], errors='coerce').dropna().astype(int).astype(str)
+        if not pcs.empty:
+            # One batched lookup for all unique postcodes instead of one per station
+            res = _nomi().query_postal_code(pcs.unique().tolist())
+            res = res.dropna(subset=['latitude'])
+            res = res.set_index(res['postal_code'].astype(str))
+            
+            hit = pcs[pcs.isin(res.index)]
+            df.loc[hit.index, 'latitude'] = hit.map(res['latitude'])
+            df.loc[hit.index, 'longitude'] = hit.map(res['longitude'])
+            no_suburb = hit[df.loc[hit.index, 'suburb'].isna()]
+            df.loc[no_suburb.index, 'suburb'] = no_suburb.map(res['place_name'])
             
-    df_clean = df.dropna(subset=['latitude', 'longitude']).copy()
+    df_clean = df.dropna(subset=['latitude', 'longitude'])
     print(f"   Retained {len(df_clean)} stations with valid coordinates.")
     return df_clean
 
@@ -135,42 +165,46 @@ def analyze_spatial_clustering(stations_df):
     """
     Performs Local Moran's I.
     """
+    # Heavy GEOS/PROJ-backed stack; only loaded once there is data to analyse
+    import geopandas as gpd
+    import shapely
+    from libpysal.weights import DistanceBand
+    from esda.moran import Moran_Local
+
     print("🛰️  Running Spatial Econometrics (Moran's I)...")
     
-    # Group by site_id to ensure uniqueness (though we already filtered to latest)
-    gdf_data = stations_df.copy()
-    
-    geometry = [Point(xy) for xy in zip(gdf_data.longitude, gdf_data.latitude)]
-    gdf = gpd.GeoDataFrame(gdf_data, geometry=geometry)
+    # Wrap the stations frame directly rather than copying it first; the
+    # geometry lives only on the new GeoDataFrame, not on the caller's frame.
+    geometry = shapely.points(stations_df['longitude'].to_numpy(), stations_df['latitude'].to_numpy())
+    gdf = gpd.GeoDataFrame(stations_df, geometry=geometry, crs="EPSG:4326")
     
     try:
-        w = DistanceBand.from_dataframe(gdf, threshold=0.05, binary=True, silence_warnings=True) 
+        # Project to the local UTM zone so the band is in metres (a degree of
+        # longitude shrinks away from the equator), then build the weights
+        # from a KD-tree over the projected coordinates.
+        proj = gdf.geometry.to_crs(gdf.estimate_utm_crs())
+        coords = np.column_stack([proj.x.to_numpy(), proj.y.to_numpy()])
+        w = DistanceBand(coords, threshold=NEIGHBOUR_RADIUS_M, binary=True, build_sp=True, silence_warnings=True)
         w.transform = 'r'
         
         y = gdf['price_cpl'].values
-        moran_loc = Moran_Local(y, w)
+        # Conditional permutations spread over all cores; seeded so ratings are
+        # reproducible run to run
+        moran_loc = Moran_Local(
+            y, w, permutations=MORAN_PERMUTATIONS, n_jobs=-1, keep_simulations=False, seed=42
+        )
         
         sig = moran_loc.p_sim < 0.05
         quadrant = moran_loc.q
         
-        labels = []
-        for i in range(len(gdf)):
-            if not sig[i]:
-                labels.append("Neutral")
-            else:
-                if quadrant[i] == 1: labels.append("🔴 Hot Spot (High-High)")
-                elif quadrant[i] == 2: labels.append("🔵 Cold outlier (Low-High)")
-                elif quadrant[i] == 3: labels.append("🟢 Cold Spot (Low-Low)")
-                elif quadrant[i] == 4: labels.append("🟠 Hot outlier (High-Low)")
-                else: labels.append("Neutral")
-                
-        gdf['spatial_cluster'] = labels
+        codes = np.where(sig & (quadrant >= 1) & (quadrant <= 4), quadrant, 0).astype(np.int8)
+        gdf['spatial_cluster'] = pd.Categorical.from_codes(codes, categories=CLUSTER_LABELS)
         gdf['moran_p'] = moran_loc.p_sim
         return gdf
         
     except Exception as e:
         print(f"⚠️ Spatial analysis failed: {e}")
-        gdf['spatial_cluster'] = "Neutral"
+        gdf['spatial_cluster'] = pd.Categorical.from_codes(np.zeros(len(gdf), dtype=np.int8), categories=CLUSTER_LABELS)
         gdf['moran_p'] = 1.0
         return gdf
 
@@ -201,20 +235,12 @@ def main():
         # Fairness Score = Price - TGP
         spatial_df['fairness_score'] = spatial_df['price_cpl'] - current_tgp
         
-        def get_rating(row):
-            margin = row['fairness_score']
-            cluster = row['spatial_cluster']
-            
-            if margin <= 5.0:
-                if "Cold Spot" in cluster: return "🌟 SUPER VALUE"
-                return "✅ Fair Price"
-            elif margin <= 15.0:
-                return "⚪ Market Price"
-            else:
-                if "Hot Spot" in cluster: return "❌ PRICE GOUGE"
-                return "⚠️ Expensive"
-                
-        spatial_df['rating'] = spatial_df.apply(get_rating, axis=1)
+        # Rating = margin band, sharpened by the spatial cluster at either end
+        margin = spatial_df['fairness_score'].to_numpy()
+        cluster = spatial_df['spatial_cluster'].cat.codes.to_numpy()
+        conditions = [(margin <= 5.0) & (cluster == COLD_SPOT), margin <= 5.0, margin <= 15.0, cluster == HOT_SPOT]
+        rating = np.select(conditions, [0, 1, 2, 3], default=4).astype(np.int8)
+        spatial_df['rating'] = pd.Categorical.from_codes(rating, categories=RATING_LABELS)
         spatial_df['state'] = state_code
         all_ratings.append(spatial_df)
     
@@ -230,6 +256,9 @@ def main():
     full_df['suburb'] = full_df['suburb'].fillna("Unknown")
     
     full_df[final_cols].to_csv(OUTPUT_FILE, index=False)
+    # Typed, columnar copy for programmatic readers; rating/spatial_cluster
+    # stay categorical (dictionary-encoded). The CSV is for inspection.
+    full_df[final_cols].to_parquet(OUTPUT_FILE_PARQUET, index=False, compression='zstd')
     print(f"\n✅ All Ratings Updated: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
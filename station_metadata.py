@@ -5,20 +5,46 @@ except:
     pass
 import pandas as pd
 import os
+import re
 import numpy as np
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 LIVE_FILE = os.path.join(BASE_DIR, "live_snapshot.csv")
 RATINGS_FILE = os.path.join(BASE_DIR, "station_ratings.csv")
+RATINGS_PARQUET_FILE = os.path.join(BASE_DIR, "station_ratings.parquet")
 METADATA_FILE = os.path.join(BASE_DIR, "station_metadata.csv")
 
+# Brand detection: one case-insensitive pass per name, token -> display icon
+_BRAND_RE = re.compile(r"(bp|shell|caltex|ampol|7[- ]?eleven|costco|united|puma)", re.I)
+_BRAND_ICONS = {
+    "bp": "🟢 BP",
+    "shell": "🟡 Shell",
+    "caltex": "🔴 Ampol",
+    "ampol": "🔴 Ampol",
+    "7-eleven": "🟠 7-Eleven",
+    "7 eleven": "🟠 7-Eleven",
+    "7eleven": "🟠 7-Eleven",
+    "costco": "🔵 Costco",
+    "united": "🔵 United",
+    "puma": "🟢 Puma",
+}
+
+_NOMI = None
+
+def _nomi():
+    """Shared pgeocode AU postcode table, parsed on first use only."""
+    global _NOMI
+    if _NOMI is None:
+        import pgeocode # Lazy import to avoid loading large dataset on startup
+        _NOMI = pgeocode.Nominatim('au')
+    return _NOMI
+
 def generate_metadata():
     """
     Consolidates station metadata (ID, Name, Brand, Suburb, Postcode, Lat, Lon)
     into a single lookup file for the dashboard.
     """
-    import pgeocode # Lazy import to avoid loading large dataset on startup
     print("🗺️ Generating Station Metadata Map...")
     
     # 1. Load Live Data (Primary Source for IDs)
@@ -27,17 +53,19 @@ def generate_metadata():
         legacy = os.path.join(BASE_DIR, "brisbane_fuel_live_collection.csv")
         if os.path.exists(legacy):
             print("⚠️ Snapshot missing, using legacy collection file.")
-            live_df = pd.read_csv(legacy)
+            live_df = pd.read_csv(legacy, engine='pyarrow')
         else:
             print("❌ Live data missing.")
             return
     else:
-        live_df = pd.read_csv(LIVE_FILE)
+        live_df = pd.read_csv(LIVE_FILE, engine='pyarrow')
     
     # 2. Load Ratings (Secondary Source for Suburbs/Names)
     ratings_df = pd.DataFrame()
-    if os.path.exists(RATINGS_FILE):
-        ratings_df = pd.read_csv(RATINGS_FILE)
+    if os.path.exists(RATINGS_PARQUET_FILE):
+        ratings_df = pd.read_parquet(RATINGS_PARQUET_FILE)
+    elif os.path.exists(RATINGS_FILE):
+        ratings_df = pd.read_csv(RATINGS_FILE, engine='pyarrow')
         
     # 2b. Load Static Excel List (Tertiary Source - High Quality)
     excel_path = os.path.join(BASE_DIR, "..", "Data", "SiteID_List_QLD.xlsx")
@@ -87,18 +115,14 @@ def generate_metadata():
         if not cols_to_use: return target_df
         
         before_na = target_df['suburb'].isna().sum() if 'suburb' in target_df.columns else 0
-        merged = target_df.merge(source_df[['site_id'] + cols_to_use], on='site_id', how='left', suffixes=('', '_new'))
         
-        for col in cols_to_use:
-            col_new = col + '_new'
-            
-            # Case 1: Column existed in both, so suffix applied
-            if col_new in merged.columns:
-                merged[col] = merged[col].fillna(merged[col_new])
-                merged.drop(columns=[col_new], inplace=True)
-            # Case 2: Column only existed in source (new column), so no suffix
-            elif col in merged.columns and col not in target_df.columns:
-                pass # It's already there as 'col'
+        # Fill gaps from the source in one aligned pass; existing values win,
+        # so calling Live -> Ratings -> Excel keeps that priority.
+        src = source_df.drop_duplicates(subset='site_id').set_index('site_id')[cols_to_use]
+        target = target_df.set_index('site_id')
+        merged = target.combine_first(src).reindex(index=target.index)
+        new_cols = [c for c in cols_to_use if c not in target.columns]
+        merged = merged[list(target.columns) + new_cols].reset_index()
             
         after_na = merged['suburb'].isna().sum() if 'suburb' in merged.columns else 0
         print(f"   Merged {source_name}: Filled {before_na - after_na} missing suburbs.")
@@ -114,19 +138,16 @@ def generate_metadata():
     if 'suburb' not in stations.columns: stations['suburb'] = np.nan # Use nan for now
     if 'postcode' not in stations.columns: stations['postcode'] = ""
     
-    # Normalize Postcode
-    def clean_postcode(x):
-        try:
-            val = int(float(x))
-            return f"{val:04d}" # Ensure 4 digits for AU
-        except:
-            return str(x) if pd.notnull(x) and str(x).strip() != "" else ""
-            
-    stations['postcode'] = stations['postcode'].apply(clean_postcode)
+    # Normalize Postcode: numeric -> 4 digits for AU, anything else kept as text
+    raw_pc = stations['postcode']
+    pc_num = pd.to_numeric(raw_pc, errors='coerce')
+    pc_num = pc_num.where(np.isfinite(pc_num))
+    pc_digits = pc_num.fillna(0).astype(np.int64).astype(str).str.zfill(4)
+    pc_text = raw_pc.astype(str).where(raw_pc.notna() & (raw_pc.astype(str).str.strip() != ""), "")
+    stations['postcode'] = np.where(pc_num.notna(), pc_digits, pc_text)
     
     # Lookup Suburbs from Postcodes using pgeocode
     print("🔍 reverse-geocoding suburbs from postcodes...")
-    nomi = pgeocode.Nominatim('au')
     
     # Filter unique postcodes to query
     unique_pcs = stations[stations['suburb'].isna() | (stations['suburb'] == "Unknown")]['postcode'].unique()
@@ -137,38 +158,21 @@ def generate_metadata():
         # pgeocode query_postal_code expects just the code, returns dataframe
         # We can loop or query batch? query_postal_code handles list/series?
         # Documentation says it handles list/array.
-        res = nomi.query_postal_code(unique_pcs)
+        res = _nomi().query_postal_code(unique_pcs)
         if not res.empty:
             # pgeocode returns 'place_name' for suburb, 'postal_code'
-            for idx, row in res.iterrows():
-                pc = str(row['postal_code'])
-                sub = row['place_name']
-                if pd.notnull(sub):
-                    pc_map[pc] = sub
+            res = res.dropna(subset=['place_name'])
+            pc_map = dict(zip(res['postal_code'].astype(str), res['place_name']))
     
-    # Apply mapping
-    def fill_suburb(row):
-        if pd.notnull(row['suburb']) and row['suburb'] != "Unknown":
-            return row['suburb']
-        pc = row['postcode']
-        return pc_map.get(pc, "Unknown")
-        
-    stations['suburb'] = stations.apply(fill_suburb, axis=1)
+    # Apply mapping to stations without a known suburb
+    needs_suburb = stations['suburb'].isna() | (stations['suburb'] == "Unknown")
+    from_postcode = stations['postcode'].map(pc_map).fillna("Unknown")
+    stations['suburb'] = stations['suburb'].mask(needs_suburb, from_postcode)
     stations['suburb'] = stations['suburb'].fillna("Unknown").astype(str).str.title()
     
     # 5. Enrich Brand Data
-    def get_brand_icon(name):
-        name = str(name).lower()
-        if "bp" in name: return "🟢 BP"
-        if "shell" in name: return "🟡 Shell"
-        if "caltex" in name or "ampol" in name: return "🔴 Ampol"
-        if "7-eleven" in name or "7 eleven" in name: return "🟠 7-Eleven"
-        if "costco" in name: return "🔵 Costco"
-        if "united" in name: return "🔵 United"
-        if "puma" in name: return "🟢 Puma"
-        return "⛽ Independent"
-
-    stations['display_brand'] = stations['name'].apply(get_brand_icon)
+    brand_token = stations['name'].astype(str).str.extract(_BRAND_RE, expand=False).str.lower()
+    stations['display_brand'] = brand_token.map(_BRAND_ICONS).fillna("⛽ Independent")
 
     # Ensure 'brand' column exists (Backwards Compatibility)
     if 'brand' not in stations.columns:
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+import predictive_core as pc
+
+
+def _tiny_model(model_dir, seed=0):
+    """DeepCycleModel with small fitted boosters, skipping the CSV training run."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(200, 3)).astype(np.float32)
+    model = pc.DeepCycleModel(model_dir=str(model_dir))
+    model.classifier = xgb.XGBClassifier(n_estimators=5, max_depth=2, random_state=seed)
+    model.classifier.fit(X, (X[:, 0] > 0).astype(int))
+    model.regressor = xgb.XGBRegressor(n_estimators=5, max_depth=2, random_state=seed)
+    model.regressor.fit(X, X[:, 1])
+    model.feature_cols = ['a', 'b', 'c']
+    return model, X[:1]
+
+
+def test_save_without_treelite_drops_stale_libraries(tmp_path, monkeypatch):
+    # Libraries left over from an earlier model
+    for kind in ('clf', 'reg'):
+        (tmp_path / f"brisbane_{kind}.so").write_bytes(b"old model")
+        (tmp_path / f"brisbane_{kind}.so.sha256").write_text("old")
+
+    monkeypatch.setattr(pc, '_HAS_TREELITE', False)
+    model, row = _tiny_model(tmp_path)
+    model.save('brisbane')
+    assert not any(p.suffix in ('.so', '.sha256') for p in tmp_path.iterdir())
+
+    # A treelite-enabled process must fall back to XGBoost, not old libraries
+    monkeypatch.setattr(pc, '_HAS_TREELITE', True)
+    monkeypatch.setattr(pc, 'tl2cgen', None, raising=False)
+    loaded = pc.DeepCycleModel(model_dir=str(tmp_path))
+    assert loaded.load('brisbane')
+    assert loaded._clf_pred is None and loaded._reg_pred is None
+    assert loaded._predict_hike_proba(row) == pytest.approx(float(model.classifier.predict_proba(row)[0, 1]))
+    assert loaded._predict_delta(row) == pytest.approx(float(model.regressor.predict(row)[0]))
+
+
+def test_load_ignores_library_with_mismatched_fingerprint(tmp_path, monkeypatch):
+    monkeypatch.setattr(pc, '_HAS_TREELITE', False)
+    model, _ = _tiny_model(tmp_path)
+    model.save('brisbane')
+
+    # Libraries whose sidecars name some other booster
+    for kind in ('clf', 'reg'):
+        (tmp_path / f"brisbane_{kind}.so").write_bytes(b"other model")
+        (tmp_path / f"brisbane_{kind}.so.sha256").write_text("0" * 64)
+
+    opened = []
+
+    class RecordingPredictor:
+        def __init__(self, path):
+            opened.append(os.path.basename(path))
+
+    monkeypatch.setattr(pc, '_HAS_TREELITE', True)
+    monkeypatch.setattr(pc, 'tl2cgen', type('tl2cgen', (), {'Predictor': RecordingPredictor}), raising=False)
+    loaded = pc.DeepCycleModel(model_dir=str(tmp_path))
+    assert loaded.load('brisbane')
+    assert opened == []
+    assert loaded._clf_pred is None and loaded._reg_pred is None
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+import route_optimizer as ro
+
+
+def test_densify_route_caps_segment_length():
+    route = np.array([[-27.0, 153.0], [-27.0, 153.6], [-27.3, 153.6]])
+    dense = ro._densify_route(route)
+    steps = np.hypot(*np.diff(dense, axis=0).T)
+    assert steps.max() <= ro._ROUTE_STEP_DEG + 1e-9
+    # Original vertices are kept, including both ends
+    for vertex in route:
+        assert np.isclose(dense, vertex).all(axis=1).any()
+
+
+def test_station_beside_long_straight_segment_is_found(monkeypatch):
+    # Simplified geometry: a 0.6 deg (~60 km) straight leg, then a turn
+    route = [[-27.0, 153.0], [-27.0, 153.6], [-27.3, 153.6]]
+    stations = pd.DataFrame({
+        'site_id': [1, 2],
+        'latitude': [-27.01, -27.5],     # 1: ~1 km off the leg's midpoint
+        'longitude': [153.3, 153.0],     # 2: nowhere near the route
+        'price_cpl': [160.0, 150.0],
+    })
+    monkeypatch.setattr(ro, 'get_coords_from_address',
+                        lambda address, session=None: {'A': (-27.0, 153.0, 'A'), 'B': (-27.3, 153.6, 'B')}[address])
+    monkeypatch.setattr(ro, 'get_osrm_route', lambda *args, **kwargs: (route, 95.0))
+    monkeypatch.setattr(ro, 'load_local_data', lambda: stations)
+
+    result = ro.optimize_route('A', 'B')
+
+    found = result['stations']
+    assert list(found['site_id']) == [1]
+    assert found['dist_score'].iloc[0] < 0.02
+    # The returned path is OSRM's, not the densified lookup polyline
+    assert result['route_path'] == route
@@ -15,14 +15,23 @@ Changes from v1:
 import pandas as pd
 import numpy as np
 import requests
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 import re
 import warnings
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 from urllib.parse import urljoin
 
+# yfinance is imported once here rather than on every market-data call
+try:
+    import yfinance as yf
+    _HAS_YFINANCE = True
+except ImportError:
+    _HAS_YFINANCE = False
+
 warnings.filterwarnings("ignore")
 logger = logging.getLogger(__name__)
 
@@ -30,6 +39,9 @@ logger = logging.getLogger(__name__)
 AIP_URL = "https://www.aip.com.au/pricing/terminal-gate-prices"
 VIVA_URL = "https://www.vivaenergy.com.au/quick-links/terminal-gate-pricing"
 FRANKFURTER_URL = "https://api.frankfurter.app/latest?from=USD&to=AUD"
+_PRICE_RE = re.compile(r'[^\d.]')   # Strips everything but digits and '.'
+SCRAPE_MAX_BYTES = 512 * 1024    # Parse budget for a streamed scrape before reading the rest
+SCRAPE_CHUNK_BYTES = 64 * 1024
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 # Import Parity Price constants
@@ -40,18 +52,36 @@ QUALITY_PREMIUM_CPL = 2.0        # ULP95 quality premium
 SHIPPING_CPL = 3.5               # Avg freight Singapore→Australia
 WHARFAGE_CPL = 1.0               # Terminal handling
 
+# Shared keep-alive session: repeat AIP/Viva/Frankfurter hits skip the TCP+TLS handshake
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": USER_AGENT})
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+# Market tickers: Brent crude futures and AUD/USD spot
+OIL_TICKER = "BZ=F"
+FX_TICKER = "AUDUSD=X"
+
 # --- Cache ---
+CACHE_TTL_SECONDS = 21600        # 6 hours for market data, FX and live TGP
+TGP_RETRY_SECONDS = 900          # After a failed scrape, wait 15 min before retrying
+
 _market_data_cache = {}
 _market_data_cache_time = {}
 
 _live_tgp_cache = {}
 _live_tgp_cache_time = {}
 _live_tgp_source_cache = {}
+_live_tgp_miss_time = {}
 
 _fx_cache = {}
 _fx_cache_time = {}
 
 
+def _is_fresh(cache_time: dict, key, ttl: float, now: datetime) -> bool:
+    ts = cache_time.get(key)
+    return ts is not None and (now - ts).total_seconds() < ttl
+
+
 # ========================================================================== #
 #  AUD/USD Exchange Rate (Frankfurter primary, yfinance fallback)
 # ========================================================================== #
@@ -66,12 +96,11 @@ def _fetch_aud_usd_frankfurter() -> float | None:
     cache_key = "frankfurter"
     now = datetime.now()
 
-    if cache_key in _fx_cache and cache_key in _fx_cache_time:
-        if (now - _fx_cache_time[cache_key]).total_seconds() < 21600:  # 6h cache
-            return _fx_cache[cache_key]
+    if cache_key in _fx_cache and _is_fresh(_fx_cache_time, cache_key, CACHE_TTL_SECONDS, now):
+        return _fx_cache[cache_key]
 
     try:
-        resp = requests.get(FRANKFURTER_URL, timeout=8)
+        resp = _SESSION.get(FRANKFURTER_URL, timeout=8)
         if resp.status_code == 200:
             data = resp.json()
             aud_per_usd = data.get("rates", {}).get("AUD")
@@ -90,9 +119,10 @@ def _fetch_aud_usd_frankfurter() -> float | None:
 
 def _fetch_aud_usd_yfinance() -> float | None:
     """Fallback: fetch AUD/USD from yfinance."""
+    if not _HAS_YFINANCE:
+        return None
     try:
-        import yfinance as yf
-        ticker = yf.Ticker("AUDUSD=X")
+        ticker = yf.Ticker(FX_TICKER)
         hist = ticker.history(period="5d")
         if not hist.empty:
             val = float(hist["Close"].iloc[-1])
@@ -127,6 +157,27 @@ def get_aud_usd() -> float:
 #  Market Data (Oil + FX)
 # ========================================================================== #
 
+def _download_closes(period: str) -> tuple[pd.Series, pd.Series]:
+    """
+    Daily closes for oil and FX. One batched yf.download (threaded per ticker)
+    instead of two serial round trips; falls back to concurrent Ticker.history.
+    """
+    try:
+        data = yf.download(
+            [OIL_TICKER, FX_TICKER], period=period, group_by="ticker",
+            threads=True, progress=False, auto_adjust=False,
+        )
+        oil = data[OIL_TICKER]["Close"].dropna()
+        fx = data[FX_TICKER]["Close"].dropna()
+    except Exception as e:
+        logger.warning("yfinance batch download failed (%s); fetching tickers separately", e)
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            oil_f = ex.submit(lambda: yf.Ticker(OIL_TICKER).history(period=period)["Close"])
+            fx_f = ex.submit(lambda: yf.Ticker(FX_TICKER).history(period=period)["Close"])
+            oil, fx = oil_f.result(), fx_f.result()
+    return oil.rename("oil_price"), fx.rename("aud_fx")
+
+
 def fetch_market_data(days=90):
     """
     Fetches market indicators: Brent Crude (Oil) and AUD/USD Exchange Rate.
@@ -134,24 +185,22 @@ def fetch_market_data(days=90):
     """
     global _market_data_cache, _market_data_cache_time
     now = datetime.now()
-    if days in _market_data_cache and days in _market_data_cache_time:
-        if (now - _market_data_cache_time[days]).total_seconds() < 21600:  # 6 hour cache
-            return _market_data_cache[days].copy()
-
-    import yfinance as yf
+    # Any fresh window at least this long can serve the request (e.g. 20 from 30)
+    for cached_days in sorted(_market_data_cache):
+        if cached_days >= days and _is_fresh(_market_data_cache_time, cached_days, CACHE_TTL_SECONDS, now):
+            return _market_data_cache[cached_days].tail(days).copy()
 
     try:
-        # Brent Crude Oil (BZ=F)
-        oil = yf.Ticker("BZ=F").history(period=f"{days+10}d")['Close'].rename("oil_price")
-
-        # AUD/USD: try Frankfurter for latest, yfinance for history
-        fx = yf.Ticker("AUDUSD=X").history(period=f"{days+10}d")['Close'].rename("aud_fx")
+        if not _HAS_YFINANCE:
+            raise RuntimeError("yfinance is not installed")
+        # Brent Crude Oil and AUD/USD history (Frankfurter overrides the latest FX below)
+        oil, fx = _download_closes(f"{days+10}d")
 
         if oil.empty or fx.empty:
             raise ValueError("Empty data from yfinance")
 
-        # Merge and clean
-        df = pd.concat([oil, fx], axis=1).ffill().bfill()
+        # Merge and clean; float32 halves the memory traffic of the per-day math
+        df = pd.concat([oil, fx], axis=1).ffill().bfill().astype(np.float32)
         df.index = pd.to_datetime(df.index).tz_localize(None)
 
         # Override the latest FX value with Frankfurter if available
@@ -167,14 +216,15 @@ def fetch_market_data(days=90):
 
     except Exception as e:
         logger.error("Error fetching market data: %s. Using synthetic fallback.", e)
-        dates = pd.date_range(end=datetime.now(), periods=days)
+        # Midnight-aligned like the yfinance index, from the same clock read as the cache stamp
+        dates = pd.date_range(end=now, periods=days, freq="D", normalize=True)
 
         # Use Frankfurter for latest FX even in fallback
         live_fx = get_aud_usd()
 
         df = pd.DataFrame({
-            'oil_price': [75.0] * days,
-            'aud_fx': [live_fx] * days
+            'oil_price': np.full(days, 75.0, dtype=np.float32),
+            'aud_fx': np.full(days, live_fx, dtype=np.float32)
         }, index=dates)
         _market_data_cache[days] = df
         _market_data_cache_time[days] = now
@@ -187,9 +237,16 @@ def fetch_market_data(days=90):
 
 def _parse_tgp_value(raw) -> float | None:
     """Parse and sanity-check a cents-per-litre TGP value."""
+    cleaned = _PRICE_RE.sub('', str(raw))
+    # Shape check before float(): anything in range has a 3-4 digit whole part
+    # (101-249 cpl, or 1001-2499 tenths) and at most one '.'; this rejects
+    # empty cells, dates and long IDs without raising.
+    whole, _, frac = cleaned.partition('.')
+    if not 3 <= len(whole) <= 4 or '.' in frac:
+        return None
     try:
-        price = float(re.sub(r'[^\d.]', '', str(raw)))
-    except (ValueError, TypeError):
+        price = float(cleaned)
+    except ValueError:
         return None
 
     # Some feeds expose tenths of a cent (e.g. 1799 => 179.9 cpl).
@@ -215,32 +272,64 @@ def _mogas_cpl(brent_usd: float, aud_usd: float) -> float:
     return (brent_usd + CRACK_SPREAD_USD_BBL) / barrels_to_litres / safe_aud * 100
 
 
-def _extract_aip_tgp_from_table(soup: BeautifulSoup, city_upper: str) -> float | None:
+def _mogas_cpl_array(brent_usd: np.ndarray, aud_usd: np.ndarray) -> np.ndarray:
+    """Vectorised ``_mogas_cpl`` over whole columns, computed in place in one buffer."""
+    out = np.add(brent_usd, np.float32(CRACK_SPREAD_USD_BBL), dtype=np.float32)
+    np.multiply(out, np.float32(100 / 158.987), out=out)
+    np.divide(out, np.where(aud_usd > 0, aud_usd, np.float32(0.65)), out=out)
+    return out
+
+
+def _node_text(node) -> str:
+    return node.text(separator=" ", strip=True)
+
+
+def _rows_mentioning(tree, city_upper: str) -> list:
+    """
+    <tr> rows whose text mentions the city, found by Lexbor's own text search
+    rather than serialising every row. :lexbor-contains matches an element's
+    own text, so walk each hit up to its row; if the name is split across
+    tags and nothing matches, fall back to scanning every row.
+    """
+    quoted = city_upper.replace('"', '\\"')
+    rows, seen = [], set()
+    for node in tree.css(f':lexbor-contains("{quoted}" i)'):
+        while node is not None and node.tag != "tr":
+            node = node.parent
+        if node is not None and node.mem_id not in seen:
+            seen.add(node.mem_id)
+            rows.append(node)
+    if not rows:
+        rows = [row for row in tree.css("tr") if city_upper in row.text().upper()]
+    return rows
+
+
+def _extract_aip_tgp_from_table(tree: LexborHTMLParser, city_upper: str) -> float | None:
     """
     Extract city TGP from a rendered AIP HTML table when Drupal exposes rows.
     Handles both city-as-row and city-as-column table layouts.
     """
-    for table in soup.find_all("table"):
-        rows = table.find_all("tr")
+    for table in tree.css("table"):
+        rows = table.css("tr")
         if not rows:
             continue
 
-        headers = [cell.get_text(" ", strip=True).upper() for cell in rows[0].find_all(["th", "td"])]
+        headers = [_node_text(cell).upper() for cell in rows[0].css("th, td")]
         city_index = next((idx for idx, header in enumerate(headers) if city_upper == header), None)
 
         if city_index is not None:
             for row in reversed(rows[1:]):
-                cells = row.find_all(["th", "td"])
+                cells = row.css("th, td")
                 if city_index < len(cells):
-                    value = _parse_tgp_value(cells[city_index].get_text(" ", strip=True))
+                    value = _parse_tgp_value(_node_text(cells[city_index]))
                     if value is not None:
                         return value
 
-        for row in rows:
-            cells = row.find_all(["th", "td"])
+        for row in _rows_mentioning(table, city_upper):
+            cells = row.css("th, td")
             if not cells:
                 continue
-            cell_text = [cell.get_text(" ", strip=True) for cell in cells]
+            cell_text = [_node_text(cell) for cell in cells]
             if city_upper not in " ".join(cell_text).upper():
                 continue
             for text in cell_text:
@@ -253,12 +342,12 @@ def _extract_aip_tgp_from_table(soup: BeautifulSoup, city_upper: str) -> float |
     return None
 
 
-def _find_aip_daily_workbook_url(soup: BeautifulSoup, base_url: str) -> str | None:
+def _find_aip_daily_workbook_url(tree: LexborHTMLParser, base_url: str) -> str | None:
     """Find the current non-annual AIP TGP workbook link on an AIP page."""
     candidates = []
-    for link in soup.find_all("a", href=True):
-        href = link["href"]
-        text = link.get_text(" ", strip=True)
+    for link in tree.css("a[href]"):
+        href = link.attributes.get("href") or ""
+        text = _node_text(link)
         target = f"{href} {text}".lower()
         if ".xlsx" not in target:
             continue
@@ -270,33 +359,33 @@ def _find_aip_daily_workbook_url(soup: BeautifulSoup, base_url: str) -> str | No
     return candidates[0] if candidates else None
 
 
-def _find_aip_historical_page_url(soup: BeautifulSoup, base_url: str) -> str | None:
+def _find_aip_historical_page_url(tree: LexborHTMLParser, base_url: str) -> str | None:
     """Find AIP's historical TGP page, which currently hosts the daily workbook."""
-    for link in soup.find_all("a", href=True):
-        href = link["href"]
-        text = link.get_text(" ", strip=True)
+    for link in tree.css("a[href]"):
+        href = link.attributes.get("href") or ""
+        text = _node_text(link)
         target = f"{href} {text}".lower()
         if "historical" in target and "tgp" in target:
             return urljoin(base_url, href)
     return None
 
 
-def _fetch_aip_workbook_url(soup: BeautifulSoup, headers: dict[str, str]) -> str | None:
-    workbook_url = _find_aip_daily_workbook_url(soup, AIP_URL)
+def _fetch_aip_workbook_url(tree: LexborHTMLParser) -> str | None:
+    workbook_url = _find_aip_daily_workbook_url(tree, AIP_URL)
     if workbook_url:
         return workbook_url
 
-    historical_url = _find_aip_historical_page_url(soup, AIP_URL)
+    historical_url = _find_aip_historical_page_url(tree, AIP_URL)
     if not historical_url:
         return None
 
     try:
-        response = requests.get(historical_url, headers=headers, timeout=10)
+        response = _SESSION.get(historical_url, timeout=10)
         if response.status_code != 200:
             logger.warning("AIP historical TGP page returned HTTP %d", response.status_code)
             return None
-        historical_soup = BeautifulSoup(response.text, "html.parser")
-        return _find_aip_daily_workbook_url(historical_soup, historical_url)
+        historical_tree = LexborHTMLParser(response.content)
+        return _find_aip_daily_workbook_url(historical_tree, historical_url)
     except Exception as e:
         logger.warning("AIP historical TGP page fetch failed: %s", e)
         return None
@@ -323,35 +412,24 @@ def _extract_aip_tgp_from_workbook(workbook_bytes: bytes, city_upper: str) -> fl
     return _parse_tgp_value(values.iloc[-1])
 
 
-def fetch_live_tgp(city="BRISBANE"):
-    """
-    Scrapes the current Terminal Gate Price from AIP (Primary) or Viva (Secondary).
-    Returns float (cents per litre) or None.
-    """
-    global _live_tgp_cache, _live_tgp_cache_time
-    city_upper = city.upper()
-    now = datetime.now()
-    if city_upper in _live_tgp_cache and city_upper in _live_tgp_cache_time:
-        if (now - _live_tgp_cache_time[city_upper]).total_seconds() < 21600:  # 6 hour cache
-            return _live_tgp_cache[city_upper]
-
-    # 1. Try AIP
-    headers = {"User-Agent": USER_AGENT}
+def _scrape_aip(city_upper: str) -> tuple[float, str] | None:
+    """AIP page table, then its daily workbook. Returns (cpl, source) or None."""
     try:
-        r = requests.get(AIP_URL, headers=headers, timeout=10)
+        r = _SESSION.get(AIP_URL, timeout=10)
         if r.status_code == 200:
-            soup = BeautifulSoup(r.text, 'html.parser')
-            value = _extract_aip_tgp_from_table(soup, city_upper)
+            # selectolax (Lexbor C parser) on raw bytes: no Python-side decode
+            tree = LexborHTMLParser(r.content)
+            value = _extract_aip_tgp_from_table(tree, city_upper)
             if value is not None:
-                return _cache_live_tgp(city_upper, value, now, "AIP table")
+                return value, "AIP table"
 
-            workbook_url = _fetch_aip_workbook_url(soup, headers)
+            workbook_url = _fetch_aip_workbook_url(tree)
             if workbook_url:
-                workbook_response = requests.get(workbook_url, headers=headers, timeout=15)
+                workbook_response = _SESSION.get(workbook_url, timeout=15)
                 if workbook_response.status_code == 200:
                     value = _extract_aip_tgp_from_workbook(workbook_response.content, city_upper)
                     if value is not None:
-                        return _cache_live_tgp(city_upper, value, now, "AIP workbook")
+                        return value, "AIP workbook"
                 else:
                     logger.warning("AIP TGP workbook returned HTTP %d", workbook_response.status_code)
             else:
@@ -360,26 +438,92 @@ def fetch_live_tgp(city="BRISBANE"):
             logger.warning("AIP TGP page returned HTTP %d", r.status_code)
     except Exception as e:
         logger.warning("AIP TGP fetch failed: %s", e)
+    return None
+
 
-    # 2. Try Viva Energy (Fallback)
+def _extract_viva_tgp(tree: LexborHTMLParser, city_upper: str) -> float | None:
+    """First parseable price on the Viva Energy TGP row for the city."""
+    for row in _rows_mentioning(tree, city_upper):
+        for col in row.css('td'):
+            raw = col.text().strip()
+            if not raw or city_upper in raw.upper():
+                continue
+            price = _parse_tgp_value(raw)
+            if price is not None:
+                return price
+    return None
+
+
+def _read_capped(chunks, limit: int) -> tuple[bytes, bool]:
+    """Read streamed chunks until ``limit`` bytes. Returns (body, truncated)."""
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+        if len(body) >= limit:
+            return bytes(body), True
+    return bytes(body), False
+
+
+def _complete_rows(body: bytes) -> bytes:
+    """Cut a truncated page back to its last closed table row, so no cell is parsed half-received."""
+    cut = body.rfind(b"</tr>")
+    return body[:cut + 5] if cut >= 0 else body
+
+
+def _scrape_viva(city_upper: str) -> float | None:
+    """Viva Energy TGP for the city, parsing only as much of the page as needed."""
     try:
-        r = requests.get(VIVA_URL, headers=headers, timeout=10)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, 'html.parser')
-            for row in soup.find_all('tr'):
-                text = row.get_text().upper()
-                if city_upper in text:
-                    cols = row.find_all('td')
-                    for col in cols:
-                        raw = col.get_text().strip()
-                        if not raw or city_upper in raw.upper():
-                            continue
-                        price = _parse_tgp_value(raw)
-                        if price is not None:
-                            return _cache_live_tgp(city_upper, price, now, "Viva fallback")
+        with _SESSION.get(VIVA_URL, timeout=10, stream=True) as r:
+            if r.status_code != 200:
+                return None
+            # City rows sit in a flat list, so a bounded prefix usually holds
+            # the row; the rest of the page is only read if it doesn't.
+            chunks = r.iter_content(chunk_size=SCRAPE_CHUNK_BYTES)
+            body, truncated = _read_capped(chunks, SCRAPE_MAX_BYTES)
+            # Same Lexbor C parser as the AIP page instead of bs4 + html.parser
+            prefix = _complete_rows(body) if truncated else body
+            price = _extract_viva_tgp(LexborHTMLParser(prefix), city_upper)
+            if price is None and truncated:
+                body += b"".join(chunks)
+                price = _extract_viva_tgp(LexborHTMLParser(body), city_upper)
+            return price
     except Exception as e:
         logger.warning("Viva TGP fetch failed: %s", e)
+    return None
+
+
+def fetch_live_tgp(city="BRISBANE"):
+    """
+    Scrapes the current Terminal Gate Price from AIP (Primary) or Viva (Secondary).
+    Returns float (cents per litre) or None.
+    """
+    global _live_tgp_cache, _live_tgp_cache_time
+    city_upper = city.upper()
+    now = datetime.now()
+    if city_upper in _live_tgp_cache and _is_fresh(_live_tgp_cache_time, city_upper, CACHE_TTL_SECONDS, now):
+        return _live_tgp_cache[city_upper]
+    # Both sources failed recently; don't re-hit AIP + Viva on every refresh
+    if _is_fresh(_live_tgp_miss_time, city_upper, TGP_RETRY_SECONDS, now):
+        return None
+
+    # Both sources in flight at once, so a dead AIP no longer delays the Viva
+    # fallback by its full timeout. AIP still wins whenever it yields a price.
+    ex = ThreadPoolExecutor(max_workers=2)
+    aip_future = ex.submit(_scrape_aip, city_upper)
+    viva_future = ex.submit(_scrape_viva, city_upper)
+    ex.shutdown(wait=False)
+
+    aip = aip_future.result()
+    if aip is not None:
+        viva_future.cancel()
+        value, source = aip
+        return _cache_live_tgp(city_upper, value, now, source)
+
+    price = viva_future.result()
+    if price is not None:
+        return _cache_live_tgp(city_upper, price, now, "Viva fallback")
 
+    _live_tgp_miss_time[city_upper] = now
     return None
 
 
@@ -387,12 +531,12 @@ def fetch_live_tgp(city="BRISBANE"):
 #  TGP History Construction
 # ========================================================================== #
 
-def get_tgp_history(days=90, city="BRISBANE"):
+def get_tgp_history(days=90, city="BRISBANE", market_df=None):
     """
     Returns a pandas Series of TGP history.
     Strategy:
     1. Get current LIVE TGP.
-    2. Get Market Data (Oil, FX).
+    2. Get Market Data (Oil, FX), unless the caller already fetched it.
     3. Calculate 'Theoretical TGP' history based on Import Parity.
     4. Bias/Shift the theoretical curve so the last point matches the LIVE TGP.
     """
@@ -404,28 +548,30 @@ def get_tgp_history(days=90, city="BRISBANE"):
         logger.warning("Using emergency TGP fallback of 170.0 cpl for %s", city)
 
     # 2. Market Drivers
-    market_df = fetch_market_data(days)
+    if market_df is None:
+        market_df = fetch_market_data(days)
 
     # 3. Calculate MOGAS/crude component in cents per litre.
-    market_df['mogas_cpl'] = market_df.apply(
-        lambda row: _mogas_cpl(float(row['oil_price']), float(row['aud_fx'])),
-        axis=1,
+    mogas_cpl = _mogas_cpl_array(
+        market_df['oil_price'].to_numpy(dtype=np.float32),
+        market_df['aud_fx'].to_numpy(dtype=np.float32),
     )
 
     # 4. Anchor to Reality
-    last_theoretical = market_df['mogas_cpl'].iloc[-1]
+    last_theoretical = float(mogas_cpl[-1])
 
     if last_theoretical > 0:
         # TGP is not just commodity cost; it includes a relatively stable basis
         # of excise, freight, terminal and wholesale margin. Preserve commodity
         # cpl moves with an additive basis instead of scaling the whole series.
-        basis_cpl = live_tgp - last_theoretical
-        tgp_series = market_df['mogas_cpl'] + basis_cpl
+        # Widened to float64 once so the curve ends exactly on the live price,
+        # then shifted in place; the only Series is the one returned.
+        tgp_values = mogas_cpl.astype(np.float64)
+        tgp_values += live_tgp - last_theoretical
     else:
-        tgp_series = pd.Series([live_tgp] * len(market_df), index=market_df.index)
+        tgp_values = np.full(len(market_df), live_tgp)
 
-    tgp_series.name = 'tgp'
-    return tgp_series
+    return pd.Series(tgp_values, index=market_df.index, name='tgp')
 
 
 # ========================================================================== #
@@ -518,33 +664,37 @@ def analyze_trend(city="BRISBANE"):
       - oil_price_usd: current Brent crude USD/bbl
       - import_parity: IPP analysis dict
     """
-    history = get_tgp_history(days=30, city=city)
-    current_tgp = history.iloc[-1]
+    # One market fetch serves both the TGP history and the oil/FX enrichment
+    market_30d = fetch_market_data(days=30)
+    history = get_tgp_history(days=30, city=city, market_df=market_30d)
+    # Scalar lookups straight off the arrays, not through pandas indexing
+    tgp_arr = history.to_numpy(dtype=np.float64, copy=False)
+    current_tgp = tgp_arr[-1]
 
     # Trend (Last 7 days)
-    delta_7d = current_tgp - history.iloc[-8] if len(history) > 7 else 0
+    delta_7d = current_tgp - tgp_arr[-8] if len(tgp_arr) > 7 else 0
     trend_direction = "RISING" if delta_7d > 0.5 else "FALLING" if delta_7d < -0.5 else "STABLE"
 
-    # Market data for enrichment
-    market = fetch_market_data(days=20)
+    # Market data for enrichment; the latest value and the 10-day lag only
+    # look at the tail, so the 30-day arrays serve without a 20-day slice
+    oil_arr = market_30d['oil_price'].to_numpy(dtype=np.float64)
+    fx_arr = market_30d['aud_fx'].to_numpy(dtype=np.float64)
 
     # Current MOGAS (AUD) — fixes the ticker showing '--.-'
     current_mogas = None
     current_oil = None
     current_fx = None
 
-    if not market.empty:
-        current_oil = round(float(market['oil_price'].iloc[-1]), 2)
-        current_fx = round(float(market['aud_fx'].iloc[-1]), 6)
+    if len(oil_arr):
+        current_oil = round(float(oil_arr[-1]), 2)
+        current_fx = round(float(fx_arr[-1]), 6)
 
         if current_fx and current_fx > 0:
             current_mogas = round(_mogas_cpl(current_oil, current_fx), 2)
 
     # Singapore Lag (Proxy using Oil 10 days ago vs today)
-    if len(market) > 10:
-        oil_10_ago = market['oil_price'].iloc[-11]
-        oil_now = market['oil_price'].iloc[-1]
-        lag_delta = (oil_now - oil_10_ago)
+    if oil_arr.size > 10:
+        lag_delta = float(oil_arr[-1] - oil_arr[-11])
         lag_msg = (
             "ROCKET (Rising Cost)" if lag_delta > 2
             else "FEATHER (Dropping Cost)" if lag_delta < -2
@@ -565,8 +715,9 @@ def analyze_trend(city="BRISBANE"):
         'delta_7d': round(delta_7d, 2),
         'import_parity_lag': lag_msg,
         'history': {
-            'dates': history.index.strftime('%Y-%m-%d').tolist(),
-            'values': history.round(2).tolist()
+            # Straight from the datetime64/float64 buffers; no per-element strftime
+            'dates': np.datetime_as_string(history.index.to_numpy(dtype='datetime64[D]'), unit='D').tolist(),
+            'values': np.round(tgp_arr, 2).tolist()
         },
         # New enrichment fields
         'current_mogas': current_mogas,
@@ -1,3 +1,8 @@
+import hashlib
+import json
+import os
+import time
+
 from predictive_core import DeepCycleModel
 
 # Initialize
@@ -5,10 +10,39 @@ model = DeepCycleModel()
 
 # Train on your Master Dataset
 # (Using the filename you confirmed works)
-CSV_PATH = 'brisbane_fuel_history_clean.csv' 
+CSV_PATH = 'brisbane_fuel_history_clean.csv'
+MODEL_PATH = os.path.join(model.model_dir, 'brisbane.pkl')
+META_PATH = MODEL_PATH + '.meta'
+
+
+def csv_sha256(path):
+    """SHA-256 of the training CSV, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def trained_on(sha):
+    """True if the deployed model was built from a CSV with this hash."""
+    if not os.path.exists(MODEL_PATH) or not os.path.exists(META_PATH):
+        return False
+    try:
+        with open(META_PATH) as f:
+            return json.load(f).get('sha256') == sha
+    except (OSError, ValueError):
+        return False
+
 
 try:
-    model.train(CSV_PATH, city_name='brisbane')
-    print("\n🎉 Deployment Successful! 'models/brisbane.pkl' is ready.")
+    csv_sha = csv_sha256(CSV_PATH)
+    if trained_on(csv_sha):
+        print(f"✅ {CSV_PATH} unchanged since the last training run; keeping '{MODEL_PATH}'.")
+    else:
+        model.train(CSV_PATH, city_name='brisbane')
+        with open(META_PATH, 'w') as f:
+            json.dump({'sha256': csv_sha, 'csv': CSV_PATH, 'trained_at': time.time()}, f)
+        print(f"\n🎉 Deployment Successful! '{MODEL_PATH}' is ready.")
 except Exception as e:
-    print(f"❌ Training Failed: {e}")
\ No newline at end of file
+    print(f"❌ Training Failed: {e}")